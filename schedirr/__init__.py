@@ -0,0 +1,9 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2023 WUR, Wageningen
+""" schedirr - a Python package for making calculations with regard to irrigation scheduling """
+
+__author__ = "Steven B. Hoek"
+__version__ = "0.1.0"
+
+# Nothing is imported here on purpose: the command line tool is started very
+# often, so every module is only loaded when it's actually needed
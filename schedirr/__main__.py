@@ -0,0 +1,9 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2023 WUR, Wageningen
+""" Allows the package to be run as: python -m schedirr """
+from .cli import main
+
+__author__ = "Steven B. Hoek"
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2023 WUR, Wageningen
+""" cli - a Python module with the command line interface of package schedirr """
+from typing import TYPE_CHECKING, NamedTuple, Optional, List, Sequence
+from pathlib import Path
+import argparse
+import sys
+
+if TYPE_CHECKING:
+    from .fileinput import InputReader
+
+__author__ = "Steven B. Hoek"
+
+# The tool is meant to be launched many times in a row (e.g. from cron), so
+# modules that take a while to load - e.g. numpy and pandas - must not be
+# imported at module level here. The test suite checks that this budget is kept.
+STARTUP_BUDGET: float = 0.15 # seconds on top of the bare interpreter start-up
+
+class Settings(NamedTuple):
+    fn_enviro: Path
+    fn_cropcult: Path
+    u1: int
+    un: int
+    sp: float
+    ep: float
+
+def read_config(ini_fn:Path) -> Settings:
+    # Relative filenames in the configuration are taken relative to the folder of the file
+    from configparser import ConfigParser, Error
+    ini_fn = Path(ini_fn)
+    if not ini_fn.exists(): raise ValueError("File %s not found!" % ini_fn)
+    config = ConfigParser()
+    try:
+        config.read(ini_fn)
+    except Error as e:
+        raise ValueError("File %s is not a valid configuration file: %s" % (ini_fn, e))
+    section = config['DEFAULT']
+    for key in ['FilenameEnvironmentalData', 'FilenameCropCalendarData', 'FirstMonth', 'LastMonth', 'SpreadingPeriod', 'Efficiency']:
+        if key not in section: raise ValueError("Key %s missing in configuration" % key)
+
+    fn_enviro = ini_fn.parent / section['FilenameEnvironmentalData']
+    if not fn_enviro.exists(): raise ValueError("Filename with environmental data not found!")
+    fn_cropcult = ini_fn.parent / section['FilenameCropCalendarData']
+    if not fn_cropcult.exists(): raise ValueError("Filename with crop calendar not found!")
+
+    # Periods are 1-based, so 1 is for January etc.
+    return Settings(fn_enviro, fn_cropcult, int(section['FirstMonth']), int(section['LastMonth']),
+        float(section['SpreadingPeriod']), float(section['Efficiency']))
+
+def get_reader(fn:Path) -> "InputReader":
+    # Select the reader on the basis of the extension of the file
+    from .fileinput import TextInputReader, CsvInputReader, TsvInputReader
+    suffix = Path(fn).suffix.lower()
+    if suffix == ".txt": return TextInputReader()
+    elif suffix == ".csv": return CsvInputReader()
+    elif suffix == ".tsv": return TsvInputReader()
+    else: raise ValueError("Not able to handle input files with extension %s" % suffix)
+
+def read_data(fn:Path, kind:str):
+    # Read environmental data (kind "env") or crop stages (kind "stages") from the given file
+    suffix = Path(fn).suffix.lower()
+    reader = get_reader(fn)
+    if suffix in [".csv", ".tsv"]:
+        # The readers for these formats can only handle environmental data and need pandas
+        if kind != "env": raise ValueError("Not able to read crop stages from %s files" % suffix)
+        from importlib.util import find_spec
+        if find_spec("pandas") is None:
+            raise ValueError("Reading %s files requires pandas - install schedirr[pandas]" % suffix)
+    try:
+        if kind == "env": data = reader.read_env_data(fn)
+        else: data = reader.read_crop_stages(fn)
+    except IndexError:
+        # The text reader expects at least a header line
+        raise ValueError("No data could be read from file %s" % fn)
+    if len(data) == 0: raise ValueError("No data could be read from file %s" % fn)
+    return reader, data
+
+def _read_input(settings:Settings):
+    env_data = read_data(settings.fn_enviro, "env")[1]
+    stage_data = read_data(settings.fn_cropcult, "stages")[1]
+    return env_data, stage_data
+
+def _cmd_run(args:argparse.Namespace) -> int:
+    from .irreq import irr_proc
+    settings = read_config(args.config)
+    env_data, stage_data = _read_input(settings)
+    result = irr_proc(settings.u1, settings.un, settings.sp, settings.ep, env_data, stage_data)
+    print("period\tIRQ")
+    for u in range(settings.u1, settings.un + 1):
+        print("%s\t%s" % (u, round(result[u-1], 3)))
+    return 0
+
+def _cmd_sweep(args:argparse.Namespace) -> int:
+    # Calculate the requirements for all combinations of spreading period and efficiency
+    from .irreq import irr_proc
+    settings = read_config(args.config)
+    env_data, stage_data = _read_input(settings)
+    sp_values: List[float] = args.sp if args.sp else [settings.sp]
+    ep_values: List[float] = args.efficiency if args.efficiency else [settings.ep]
+    periods = range(settings.u1, settings.un + 1)
+    if args.output is None:
+        # Calculate all rows first, so that nothing is printed when one of the combinations fails
+        rows = []
+        for sp in sp_values:
+            for ep in ep_values:
+                result = irr_proc(settings.u1, settings.un, sp, ep, env_data, stage_data)
+                rows.append([str(sp), str(ep)] + [str(round(result[u-1], 3)) for u in periods])
+        print("\t".join(["sp", "ep"] + [str(u) for u in periods]))
+        for row in rows: print("\t".join(row))
+    else:
+        # Stream the results to a chunked file; all periods are stored, also the ones not calculated
+        from .fileoutput import ResultsWriter
+        unit = args.unit if args.unit else Path(args.config).stem
+        with ResultsWriter(args.output, len(env_data), chunk_size=args.chunk_size, append=args.append) as writer:
+            for sp in sp_values:
+                for ep in ep_values:
+                    result = irr_proc(settings.u1, settings.un, sp, ep, env_data, stage_data)
+                    writer.write(unit, "sp=%s,ep=%s" % (sp, ep), 0, result)
+    return 0
+
+def _cmd_convert(args:argparse.Namespace) -> int:
+    # Convert an input file from one format to the other; the extensions determine the formats
+    reader, data = read_data(args.input, args.kind)
+    header = reader.header.split(", ")
+    rows = [[str(i + 1)] + ["%g" % x for x in arr] for i, arr in enumerate(data)]
+
+    suffix = Path(args.output).suffix.lower()
+    if suffix == ".txt":
+        with open(args.output, 'w', encoding="utf-16") as f:
+            for row in [header] + rows:
+                f.write("\t".join(row) + "\n")
+    elif suffix in [".csv", ".tsv"]:
+        import csv
+        with open(args.output, 'w', newline='', encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="," if suffix == ".csv" else "\t")
+            writer.writerow(header)
+            writer.writerows(rows)
+    else:
+        raise ValueError("Not able to write output files with extension %s" % suffix)
+    return 0
+
+def make_parser() -> argparse.ArgumentParser:
+    from . import __version__
+    parser = argparse.ArgumentParser(prog="schedirr",
+        description="Calculate irrigation water requirements for tertiary units")
+    parser.add_argument("--version", action="version", version="%(prog)s " + __version__)
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    p = subparsers.add_parser("run", help="calculate the requirements for the settings in a configuration file")
+    p.add_argument("config", nargs="?", default="params.ini", type=Path, help="configuration file (default: params.ini)")
+    p.set_defaults(func=_cmd_run)
+
+    p = subparsers.add_parser("sweep", help="calculate the requirements for several spreading periods and efficiencies")
+    p.add_argument("config", nargs="?", default="params.ini", type=Path, help="configuration file (default: params.ini)")
+    p.add_argument("--sp", nargs="+", type=float, help="spreading periods (default: from configuration)")
+    p.add_argument("--efficiency", nargs="+", type=float, help="efficiencies (default: from configuration)")
+    p.add_argument("--output", type=Path, help="write the results to this chunked results file instead of to the screen")
+    p.add_argument("--unit", help="name of the unit in the results file (default: name of the configuration file)")
+    p.add_argument("--chunk-size", type=int, default=4096, help="number of records per chunk in the results file (default: 4096)")
+    p.add_argument("--append", action="store_true", help="add the results to an existing results file")
+    p.set_defaults(func=_cmd_sweep)
+
+    p = subparsers.add_parser("convert", help="convert an input file to another format (.txt, .csv or .tsv)")
+    p.add_argument("input", type=Path, help="input file")
+    p.add_argument("output", type=Path, help="output file")
+    p.add_argument("--kind", choices=["env", "stages"], default="env", help="kind of input data (default: env)")
+    p.set_defaults(func=_cmd_convert)
+    return parser
+
+def main(argv:Optional[Sequence[str]] = None) -> int:
+    args = make_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (ValueError, AssertionError, NotImplementedError, OSError) as e:
+        print("schedirr: error: %s" % e, file=sys.stderr)
+        return 1
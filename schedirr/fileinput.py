@@ -1,22 +1,23 @@
 # -*- coding: latin-1 -*-
 # Copyright (c) 2023 WUR, Wageningen
 """ fileinput - a Python module for reading input data from text, CSV and TSV files """
-from typing import NewType, TypeVar, List, Any
+from typing import TYPE_CHECKING, TypeVar, Union, List
 from collections.abc import Sequence
 from pathlib import Path
 from array import array 
 import copy
-import csv
 
 __author__ = "Steven B. Hoek"
 
 # Declaration of some types - needs to be repeated in every module
+# Numpy is only needed by the type checker; pandas is imported by the readers
+# that need it, so that importing this module remains cheap
 PathLike = TypeVar("PathLike", str, Path)
-try:
+if TYPE_CHECKING:
     import numpy as np
-    ArrayLike = TypeVar("ArrayLike", array, np.ndarray) 
-except ImportError:
-    ArrayLike = NewType("ArrayLike", array[Any]) # type: ignore
+    ArrayLike = Union[array, np.ndarray]
+else:
+    ArrayLike = array
 
 class InputReader(object):
     __header: str = ""
@@ -0,0 +1,322 @@
+# -*- coding: latin-1 -*-
+# Copyright (c) 2023 WUR, Wageningen
+""" fileoutput - a Python module for writing results to and reading them from chunked files """
+from typing import TypeVar, Optional, NamedTuple, Dict, List, Tuple, Iterable, Iterator
+from collections.abc import Sequence
+from pathlib import Path
+from array import array
+from operator import index
+import json
+import mmap
+import struct
+import sys
+import zlib
+
+__author__ = "Steven B. Hoek"
+
+# Declaration of some types - needs to be repeated in every module
+PathLike = TypeVar("PathLike", str, Path)
+Key = Tuple[str, str]
+
+# Layout of a results file:
+#   MAGIC | chunk | chunk | ... | footer | footer length (8 bytes) | MAGIC
+# Every chunk holds the columns unit, scenario, member and one column per period.
+# Each column is compressed separately, so that a reader only has to inflate the
+# columns it needs. The footer - compressed JSON - contains the string tables, the
+# position of each column in each chunk and an index from (unit, scenario) to chunks.
+# When a file is extended, the new chunks and footer are written after the old
+# trailer, which is left in place. If the appending writer never gets to close the
+# file, readers fall back on the last complete footer, i.e. on the earlier results.
+MAGIC: bytes = b"SCHEDIRR"
+VERSION: int = 1
+_TRAILER = struct.Struct("<Q")
+
+def _to_bytes(arr:array) -> bytes:
+    # Data are stored little-endian, whatever the platform
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _from_bytes(typecode:str, buf:bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(buf)
+    if sys.byteorder == "big": arr.byteswap()
+    return arr
+
+class ResultChunk(NamedTuple):
+    units: List[str]
+    scenarios: List[str]
+    members: array
+    values: Dict[int, array] # period (1-based) -> one value per row
+
+class ResultsWriter(object):
+    '''
+    Class for writing results - e.g. the irrigation requirements calculated by irr_proc -
+    to a file, as they are produced. Every record consists of a unit, a scenario, an
+    ensemble member and one value per period. Records are kept in memory until chunk_size
+    of them have been collected; then they are compressed and appended to the file. Hence
+    memory use is bounded by the chunk size rather than by the size of the whole sweep.
+    The file is only complete after close() has been called. When the writer is used in a
+    with statement and the block raises, no footer is written: a new file stays incomplete
+    and an extended file keeps its earlier contents only. An existing file can be
+    extended by opening it with append=True. Only one writer should write to a file at
+    a time: with a multiprocessing pool, let the workers return their results and pass
+    e.g. pool.imap_unordered(...) to method write_many in the parent process.
+    '''
+
+    def __init__(self, fn:PathLike, periods:int, chunk_size:int = 4096, level:int = 6, append:bool = False):
+        if periods < 1: raise ValueError("The number of periods should be at least 1!")
+        if chunk_size < 1: raise ValueError("The chunk size should be at least 1!")
+        self.__periods = periods
+        self.__chunk_size = chunk_size
+        self.__level = level
+        self.__units: List[str] = []
+        self.__scenarios: List[str] = []
+        self.__unit_ids: Dict[str, int] = {}
+        self.__scenario_ids: Dict[str, int] = {}
+        self.__chunks: List[dict] = []
+        self.__index: Dict[Tuple[int, int], List[int]] = {}
+        self.__nrows = 0
+        self.__clear_buffer()
+
+        if append and Path(fn).exists():
+            # Read the footer, then continue writing at the end, so that the old footer
+            # remains valid until the new one has been written
+            footer = _read_footer(fn)
+            if footer["periods"] != periods:
+                raise ValueError("File %s has %s periods instead of %s!" % (fn, footer["periods"], periods))
+            for unit in footer["units"]: self.__unit_id(unit)
+            for scenario in footer["scenarios"]: self.__scenario_id(scenario)
+            self.__chunks = footer["chunks"]
+            for u, s, chunk_ids in footer["index"]: self.__index[(u, s)] = chunk_ids
+            self.__nrows = footer["rows"]
+            self.__file = open(fn, 'r+b')
+            self.__file.seek(0, 2)
+        else:
+            self.__file = open(fn, 'wb')
+            self.__file.write(MAGIC)
+
+    def __clear_buffer(self):
+        self.__buf_units = array('I')
+        self.__buf_scenarios = array('I')
+        self.__buf_members = array('i')
+        self.__buf_values = [array('f') for p in range(self.__periods)]
+
+    def __unit_id(self, unit:str) -> int:
+        if unit not in self.__unit_ids:
+            self.__unit_ids[unit] = len(self.__units)
+            self.__units.append(unit)
+        return self.__unit_ids[unit]
+
+    def __scenario_id(self, scenario:str) -> int:
+        if scenario not in self.__scenario_ids:
+            self.__scenario_ids[scenario] = len(self.__scenarios)
+            self.__scenarios.append(scenario)
+        return self.__scenario_ids[scenario]
+
+    def write(self, unit:str, scenario:str, member:int, values:Sequence[float]):
+        # Add one record; values should contain one figure for each period
+        if self.__file.closed: raise ValueError("Results file is already closed!")
+        # Convert and check everything before the buffers are touched, so that a rejected
+        # record cannot leave columns of different lengths behind
+        row = array('f', values)
+        if len(row) != self.__periods:
+            raise ValueError("Expected %s values but got %s!" % (self.__periods, len(row)))
+        # Members must be integers; floats and strings are not silently converted
+        member_arr = array('i', [index(member)])
+        self.__buf_units.append(self.__unit_id(str(unit)))
+        self.__buf_scenarios.append(self.__scenario_id(str(scenario)))
+        self.__buf_members.extend(member_arr)
+        for p in range(self.__periods):
+            self.__buf_values[p].append(row[p])
+        if len(self.__buf_members) >= self.__chunk_size: self.flush()
+
+    def write_many(self, records:Iterable[Tuple[str, str, int, Sequence[float]]]):
+        # Records can come from any iterable, e.g. from the imap methods of a pool
+        for unit, scenario, member, values in records:
+            self.write(unit, scenario, member, values)
+
+    def flush(self):
+        # Compress the buffered records and append them to the file as a new chunk
+        nrows = len(self.__buf_members)
+        if nrows == 0: return
+        chunk_id = len(self.__chunks)
+        columns = []
+        for arr in [self.__buf_units, self.__buf_scenarios, self.__buf_members] + self.__buf_values:
+            data = zlib.compress(_to_bytes(arr), self.__level)
+            columns.append([self.__file.tell(), len(data)])
+            self.__file.write(data)
+        self.__chunks.append({"rows": nrows, "columns": columns})
+
+        # Update the index
+        for key in set(zip(self.__buf_units, self.__buf_scenarios)):
+            self.__index.setdefault(key, []).append(chunk_id)
+        self.__nrows += nrows
+        self.__clear_buffer()
+
+    def close(self):
+        if self.__file.closed: return
+        self.flush()
+        footer = {"version": VERSION, "start": self.__file.tell(), "periods": self.__periods, "rows": self.__nrows,
+            "units": self.__units, "scenarios": self.__scenarios, "chunks": self.__chunks,
+            "index": [[u, s, chunk_ids] for (u, s), chunk_ids in self.__index.items()]}
+        data = zlib.compress(json.dumps(footer, separators=(",", ":")).encode("utf-8"), self.__level)
+        self.__file.write(data)
+        self.__file.write(_TRAILER.pack(len(data)))
+        self.__file.write(MAGIC)
+        self.__file.close()
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Don't commit a partial set of records as if it were complete
+        if exc_type is None: self.close()
+        else: self.__file.close()
+
+    @property
+    def periods(self) -> int:
+        return self.__periods
+
+    @property
+    def rows(self) -> int:
+        # Number of records written so far, including the ones not yet flushed
+        return self.__nrows + len(self.__buf_members)
+
+def _parse_footer(mm:mmap.mmap, pos:int) -> Optional[dict]:
+    # Return the footer belonging to the trailer MAGIC at pos, or None if there's no valid one
+    if pos < len(MAGIC) + _TRAILER.size: return None
+    footer_len = _TRAILER.unpack(mm[pos - _TRAILER.size:pos])[0]
+    footer_start = pos - _TRAILER.size - footer_len
+    if footer_start < len(MAGIC): return None
+    try:
+        footer = json.loads(zlib.decompress(mm[footer_start:pos - _TRAILER.size]).decode("utf-8"))
+    except (zlib.error, ValueError):
+        return None
+    if not isinstance(footer, dict) or footer.get("start") != footer_start: return None
+    return footer
+
+def _read_footer(fn:PathLike) -> dict:
+    # Return the last complete footer; when a writer was interrupted while appending
+    # data, this is the footer that was written before
+    with open(fn, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC: raise ValueError("File %s is not a results file!" % fn)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            footer = None
+            end = len(mm)
+            while footer is None:
+                pos = mm.rfind(MAGIC, len(MAGIC), end)
+                if pos < 0: raise ValueError("File %s is incomplete - was the writer closed?" % fn)
+                footer = _parse_footer(mm, pos)
+                end = pos + len(MAGIC) - 1
+    if footer["version"] > VERSION:
+        raise ValueError("File %s has version %s; not able to handle versions above %s" % (fn, footer["version"], VERSION))
+    return footer
+
+class ResultsReader(object):
+    '''
+    Class for reading back the results written by a ResultsWriter. The file is memory-mapped
+    and only the chunks and columns that are asked for are decompressed - one chunk at a
+    time - so that slices of a very large file can be read with little memory.
+    '''
+
+    def __init__(self, fn:PathLike):
+        footer = _read_footer(fn)
+        self.__periods: int = footer["periods"]
+        self.__nrows: int = footer["rows"]
+        self.__units: List[str] = footer["units"]
+        self.__scenarios: List[str] = footer["scenarios"]
+        self.__chunks: List[dict] = footer["chunks"]
+        self.__index: Dict[Tuple[int, int], List[int]] = {(u, s): chunk_ids for u, s, chunk_ids in footer["index"]}
+        self.__unit_ids: Dict[str, int] = {unit: i for i, unit in enumerate(self.__units)}
+        self.__scenario_ids: Dict[str, int] = {scenario: i for i, scenario in enumerate(self.__scenarios)}
+        self.__file = open(fn, 'rb')
+        self.__mm = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self.__file.closed: return
+        self.__mm.close()
+        self.__file.close()
+
+    def __enter__(self) -> "ResultsReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__nrows
+
+    @property
+    def periods(self) -> int:
+        return self.__periods
+
+    @property
+    def keys(self) -> List[Key]:
+        # All combinations of unit and scenario that occur in the file
+        return [(self.__units[u], self.__scenarios[s]) for u, s in self.__index]
+
+    def __column(self, chunk:dict, col:int, typecode:str) -> array:
+        offset, length = chunk["columns"][col]
+        return _from_bytes(typecode, zlib.decompress(self.__mm[offset:offset + length]))
+
+    def iter_chunks(self, unit:Optional[str] = None, scenario:Optional[str] = None,
+        periods:Optional[Sequence[int]] = None) -> Iterator[ResultChunk]:
+        # Yield the records per chunk, restricted to the given unit, scenario and (1-based) periods
+        if periods is None: periods = range(1, self.__periods + 1)
+        for p in periods:
+            if not 1 <= p <= self.__periods: raise ValueError("Period %s is out of range!" % p)
+        if len(set(periods)) < len(periods): raise ValueError("Periods should not be repeated!")
+
+        # Use the index to find out which chunks are needed
+        u_id = self.__unit_ids.get(unit, -1) if unit is not None else -1
+        s_id = self.__scenario_ids.get(scenario, -1) if scenario is not None else -1
+        if (unit is not None and u_id < 0) or (scenario is not None and s_id < 0): return
+        chunk_ids = set()
+        for (u, s), ids in self.__index.items():
+            if (unit is None or u == u_id) and (scenario is None or s == s_id): chunk_ids.update(ids)
+
+        for chunk_id in sorted(chunk_ids):
+            chunk = self.__chunks[chunk_id]
+            units = self.__column(chunk, 0, 'I')
+            scenarios = self.__column(chunk, 1, 'I')
+            members = self.__column(chunk, 2, 'i')
+            values = {p: self.__column(chunk, 2 + p, 'f') for p in periods}
+
+            # Select the rows - a chunk may also hold records of other units and scenarios
+            if unit is not None or scenario is not None:
+                rows = [i for i in range(chunk["rows"])
+                    if (unit is None or units[i] == u_id) and (scenario is None or scenarios[i] == s_id)]
+                if len(rows) < chunk["rows"]:
+                    units = array('I', [units[i] for i in rows])
+                    scenarios = array('I', [scenarios[i] for i in rows])
+                    members = array('i', [members[i] for i in rows])
+                    values = {p: array('f', [arr[i] for i in rows]) for p, arr in values.items()}
+            yield ResultChunk([self.__units[u] for u in units], [self.__scenarios[s] for s in scenarios], members, values)
+
+    def iter_rows(self, unit:Optional[str] = None, scenario:Optional[str] = None,
+        periods:Optional[Sequence[int]] = None) -> Iterator[Tuple[str, str, int, array]]:
+        # Yield the records one by one as tuples (unit, scenario, member, values)
+        for chunk in self.iter_chunks(unit, scenario, periods):
+            columns = list(chunk.values.values())
+            for i in range(len(chunk.members)):
+                yield chunk.units[i], chunk.scenarios[i], chunk.members[i], array('f', [arr[i] for arr in columns])
+
+if __name__ == "__main__":
+    # Some example code
+    print("This is module fileoutput from package schedirr.")
+    print("The following is just for testing.\n")
+
+    import os
+    import tempfile
+    fn = os.path.join(tempfile.gettempdir(), "schedirr_results.dat")
+    with ResultsWriter(fn, periods=12, chunk_size=100) as writer:
+        for u in range(10):
+            for member in range(50):
+                writer.write("unit%s" % u, "baseline", member, array('f', [float(u + member + p) for p in range(12)]))
+    with ResultsReader(fn) as reader:
+        print("The file contains %s records for %s keys" % (len(reader), len(reader.keys)))
+        rows = list(reader.iter_rows("unit3", "baseline", periods=[1, 12]))
+        print("Records for unit3: %s; first one: %s" % (len(rows), rows[0]))
+    os.remove(fn)
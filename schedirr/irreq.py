@@ -1,24 +1,22 @@
 # -*- coding: latin-1 -*-
 # Copyright (c) 2023 WUR, Wageningen
 """ irreq - a Python module for making calculations with regard to irrigation scheduling """
-from typing import NewType, TypeVar, List, Tuple
+from typing import TYPE_CHECKING, Union, Tuple
 from collections.abc import Sequence
-from pathlib import Path
 from array import array
 from math import floor
-from cropstage import CropStage # type: ignore
-from configparser import ConfigParser
-from sys import argv 
-from fileinput import TextInputReader
+from .cropstage import CropStage
 
 __author__ = "Steven B. Hoek"
 
 # Declaration of some types - needs to be repeated in every module
-try:
+# Numpy is only needed by the type checker; importing it at run time would
+# add considerably to the start-up time of the command line tool
+if TYPE_CHECKING:
     import numpy as np
-    ArrayLike = TypeVar("ArrayLike", array, np.ndarray)
-except ImportError:
-    ArrayLike = NewType("ArrayLike", array) # type: ignore
+    ArrayLike = Union[array, np.ndarray]
+else:
+    ArrayLike = array
 
 # Declare constants
 eps: float = 0.0000001
@@ -62,7 +60,7 @@ def water_balance(M:int, ET0:float, RE:float, PR:float, ep:float, Kc0, SR0, DR,
     return result
 
 # Input data wrt. environment and crop calendar may be lists of normal arrays or lists of numpy arrays
-def irr_proc(u1:int, un:int, sp:float, ep:float, env_data:Sequence[ArrayLike], stage_data:Sequence[ArrayLike]):
+def irr_proc(u1:int, un:int, sp:float, ep:float, env_data:Sequence[ArrayLike], stage_data:Sequence[ArrayLike]) -> array:
     # Declare
     arr: ArrayLike
     
@@ -159,65 +157,13 @@ def irr_proc(u1:int, un:int, sp:float, ep:float, env_data:Sequence[ArrayLike], s
                 AF[k] = cs.area_fraction(u)
                 ATF[k] = cs.area_time_fraction(u)
             result[u-1] = round(water_balance(M, ET0[u-1], RE[u-1], PR[u-1], ep, Kc0, SR0, DR, AF, ATF), 3)
-        print(result)
+        return result
     else:
         raise NotImplementedError("Not able to handle function call with u1 > un!")
 
 if __name__ == "__main__":
-    # Immediately make clear that this is the module irreq
-    print("This is module irreq - the main module of package schedirr.")
-    print("Let's calculate irrigation water requirements for your tertiary unit!\n")
-    
-    # Get the name of the configuration file
-    config = ConfigParser()
-    if len(argv) == 1:
-        # Assume that input is taken from file params.ini
-        ini_fn = "params.ini"
-    else:
-        ini_fn = str(argv[1])
-    if not Path(ini_fn).exists(): ValueError("File %s not found!")
-    
-    # Declare
-    PathLike = TypeVar("PathLike", str, Path)    
-    fn_enviro: PathLike # type: ignore
-    fn_cropcult: PathLike # type: ignore
-    
-    # Prepare to read the input files
-    config.read(ini_fn)
-    if 'FilenameEnvironmentalData' in config['DEFAULT']:
-        fn_enviro = config['DEFAULT']['FilenameEnvironmentalData']
-        fn_enviro = Path(fn_enviro)
-        if not fn_enviro.exists(): raise ValueError("Filename with environmental data not found!")
-    if 'FilenameCropCalendarData' in config["DEFAULT"]:
-        fn_cropcult = config['DEFAULT']['FilenameCropCalendarData']
-        fn_cropcult = Path(fn_cropcult)
-        if not fn_cropcult.exists(): raise ValueError("Filename with crop calendar not found!")
-    
-    try:
-        # Periods are 1-based, so 1 is for January etc.
-        if 'FirstMonth' in config['DEFAULT']:
-            u1: int = int(config['DEFAULT']['FirstMonth'])
-        else:
-            ValueError('Key FirstMonth missing in configuration')
-        if 'LastMonth' in config['DEFAULT']:
-            un: int = int(config['DEFAULT']['LastMonth'])
-        else:
-            ValueError('Key LastMonth missing in configuration')
-        if 'SpreadingPeriod' in config['DEFAULT']:
-            sp: float = float(config['DEFAULT']['SpreadingPeriod'])
-        else:
-            ValueError('Key SpreadingPeriod missing in configuration')
-        if 'Efficiency' in config['DEFAULT']:
-            ep: float = float(config['DEFAULT']['Efficiency'])
-        else:
-            ValueError('Key Efficiency missing in configuration')          
-    
-    except Exception as e:
-        print(e) 
-        raise Exception(e)
-
-    # Now read the input files    
-    txt_reader = TextInputReader()
-    env_data = txt_reader.read_env_data(fn_enviro)
-    stage_date = txt_reader.read_crop_stages(fn_cropcult)
-    irr_proc(u1, un, sp, ep, env_data, stage_date)
+    # Same as schedirr run; start it as python -m schedirr.irreq [params.ini], since the
+    # relative imports don't allow running this file directly as a script any more
+    from sys import argv
+    from .cli import main
+    raise SystemExit(main(["run"] + argv[1:]))
@@ -3,13 +3,16 @@
 import unittest
 from . import test_area_fractions
 from . import test_area_time_fractions 
+from . import test_cli
+from . import test_fileoutput
 
 __author__ = "Steven B. Hoek"
 
 def make_test_suite():
     """Assemble test suite and return it
     """
-    allsuites = unittest.TestSuite([test_area_fractions.suite(), test_area_time_fractions.suite()])
+    allsuites = unittest.TestSuite([test_area_fractions.suite(), test_area_time_fractions.suite(),
+        test_cli.suite(), test_fileoutput.suite()])
     
     return allsuites
 
@@ -0,0 +1,140 @@
+import unittest
+import subprocess
+import sys
+import time
+import tempfile
+import io
+from contextlib import redirect_stdout, redirect_stderr
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Tuple
+from ..cli import main, STARTUP_BUDGET
+
+__author__ = "Steven B. Hoek"
+
+package_dir = Path(__file__).resolve().parent.parent
+data_dir = package_dir / "tests" / "data"
+
+def run_main(args) -> Tuple[int, str]:
+    # Return the exit code and what was written to stderr
+    err = io.StringIO()
+    with redirect_stdout(io.StringIO()), redirect_stderr(err):
+        rc = main(args)
+    return rc, err.getvalue()
+
+def run_python(*args) -> float:
+    # Return the wall time of the best of a few runs of the interpreter
+    best = float("inf")
+    for i in range(5):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + list(args), cwd=package_dir.parent, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+class TestCommandLine(unittest.TestCase):
+    test_class = None
+    
+    def test_no_heavy_imports(self):
+        code = "import sys, schedirr.cli, schedirr.irreq, schedirr.fileinput; "
+        code += "print(','.join(m for m in ['numpy', 'pandas'] if m in sys.modules))"
+        proc = subprocess.run([sys.executable, "-c", code], cwd=package_dir.parent, check=True, capture_output=True, text=True)
+        self.assertEqual(proc.stdout.strip(), "", "Modules loaded at start-up: %s" % proc.stdout.strip())
+    
+    def test_startup_budget(self):
+        baseline = run_python("-c", "pass")
+        elapsed = run_python("-m", "schedirr", "--version")
+        testmsg = "Start-up took %.3f s longer than the bare interpreter; budget is %.3f s"
+        self.assertLess(elapsed - baseline, STARTUP_BUDGET, testmsg % (elapsed - baseline, STARTUP_BUDGET))
+    
+    def test_run(self):
+        buf = io.StringIO()
+        with redirect_stdout(buf):
+            self.assertEqual(main(["run", str(package_dir / "params.ini")]), 0)
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(lines[0], "period\tIRQ")
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(lines[4], "4\t295.641")
+    
+    def test_convert(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fn = Path(tmpdir) / "dry_season.tsv"
+            self.assertEqual(main(["convert", str(package_dir / "tests" / "data" / "dry_season.txt"), str(fn), "--kind", "stages"]), 0)
+            lines = fn.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines[0], "ID\tD\tKc\tSR\tDS")
+        self.assertEqual(lines[1], "1\t0.333\t0\t0\t0")
+    
+    def test_sweep_output(self):
+        from ..fileoutput import ResultsReader
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fn = Path(tmpdir) / "results.dat"
+            args = ["sweep", str(package_dir / "params.ini"), "--efficiency", "0.6", "0.7", "--output", str(fn)]
+            self.assertEqual(main(args), 0)
+            with ResultsReader(fn) as reader:
+                self.assertEqual(sorted(reader.keys), [("params", "sp=1.0,ep=0.6"), ("params", "sp=1.0,ep=0.7")])
+                rows = list(reader.iter_rows(scenario="sp=1.0,ep=0.6", periods=[4]))
+        self.assertEqual(len(rows), 1)
+        self.assertAlmostEqual(rows[0][3][0], 320.278, places=3)
+    
+    def test_missing_config(self):
+        rc, err = run_main(["run", "does_not_exist.ini"])
+        self.assertEqual(rc, 1)
+        self.assertIn("does_not_exist.ini", err)
+    
+    def test_convert_unsupported_kind(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fn = Path(tmpdir) / "dry_season.txt"
+            rc, err = run_main(["convert", str(data_dir / "dry_season.csv"), str(fn), "--kind", "stages"])
+            self.assertEqual(rc, 1)
+            self.assertIn("crop stages", err)
+            self.assertFalse(fn.exists())
+    
+    @unittest.skipIf(find_spec("pandas") is not None, "pandas is installed")
+    def test_convert_without_pandas(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fn = Path(tmpdir) / "enviro.tsv"
+            rc, err = run_main(["convert", str(data_dir / "enviro.csv"), str(fn)])
+            self.assertEqual(rc, 1)
+            self.assertIn("schedirr[pandas]", err)
+            self.assertFalse(fn.exists())
+    
+    def test_run_with_csv_stages(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ini_fn = Path(tmpdir) / "params.ini"
+            config = (package_dir / "params.ini").read_text()
+            config = config.replace("./tests/data/dry_season.txt", str(data_dir / "dry_season.csv"))
+            config = config.replace("./tests/data/enviro.txt", str(data_dir / "enviro.txt"))
+            ini_fn.write_text(config)
+            rc, err = run_main(["run", str(ini_fn)])
+        self.assertEqual(rc, 1)
+        self.assertIn("Not able to read crop stages from .csv files", err)
+        
+    def test_empty_input(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for content in [b"", b"\xff\xfe"]:
+                fn = Path(tmpdir) / "empty.txt"
+                fn.write_bytes(content)
+                rc, err = run_main(["convert", str(fn), str(Path(tmpdir) / "out.csv")])
+                self.assertEqual(rc, 1)
+                self.assertIn("No data could be read from file", err)
+    
+    def test_invalid_config(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ini_fn = Path(tmpdir) / "params.ini"
+            ini_fn.write_text("FilenameEnvironmentalData = x\n")
+            rc, err = run_main(["run", str(ini_fn)])
+        self.assertEqual(rc, 1)
+        self.assertIn("is not a valid configuration file", err)
+    
+    def test_sweep_failure_prints_nothing(self):
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            rc = main(["sweep", str(package_dir / "params.ini"), "--sp", "1.0", "20"])
+        self.assertEqual(rc, 1)
+        self.assertEqual(out.getvalue(), "")
+        self.assertIn("spreading period", err.getvalue())
+        
+def suite():
+    """ This defines all the tests of a module"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestCommandLine))
+    return suite
@@ -0,0 +1,146 @@
+import unittest
+import subprocess
+import sys
+import tempfile
+from multiprocessing import Pool
+from array import array
+from pathlib import Path
+from ..fileoutput import ResultsWriter, ResultsReader
+
+__author__ = "Steven B. Hoek"
+
+def make_values(unit:int, member:int, periods:int = 12) -> array:
+    return array('f', [float(100 * unit + member + p / 10) for p in range(periods)])
+
+def make_record(args):
+    # To be called by the workers of a pool
+    unit, member = args
+    return "unit%s" % unit, "scen%s" % (member % 2), member, make_values(unit, member)
+
+class TestResultsFile(unittest.TestCase):
+    test_class = None
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fn = Path(self.tmpdir.name) / "results.dat"
+        
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        
+    def write_records(self, append:bool = False, units = range(5)):
+        with ResultsWriter(self.fn, periods=12, chunk_size=7, append=append) as writer:
+            for u in units:
+                for member in range(10):
+                    writer.write("unit%s" % u, "scen%s" % (member % 2), member, make_values(u, member))
+    
+    def test_round_trip(self):
+        self.write_records()
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 50)
+            self.assertEqual(reader.periods, 12)
+            self.assertEqual(len(reader.keys), 10)
+            rows = list(reader.iter_rows())
+        self.assertEqual(len(rows), 50)
+        unit, scenario, member, values = rows[13]
+        self.assertEqual((unit, scenario, member), ("unit1", "scen1", 3))
+        self.assertEqual(values, make_values(1, 3))
+    
+    def test_slices(self):
+        self.write_records()
+        with ResultsReader(self.fn) as reader:
+            rows = list(reader.iter_rows("unit2", "scen0", periods=[1, 12]))
+            self.assertEqual([r[2] for r in rows], [0, 2, 4, 6, 8])
+            for unit, scenario, member, values in rows:
+                self.assertEqual(values, array('f', [make_values(2, member)[i] for i in [0, 11]]))
+            
+            # Chunks never hold more records than the chunk size
+            for chunk in reader.iter_chunks(scenario="scen1"):
+                self.assertLessEqual(len(chunk.members), 7)
+                self.assertEqual(set(chunk.scenarios), {"scen1"})
+            self.assertEqual(list(reader.iter_rows("unknown")), [])
+            self.assertRaises(ValueError, list, reader.iter_rows(periods=[13]))
+            self.assertRaises(ValueError, list, reader.iter_rows(periods=[4, 4]))
+    
+    def test_append(self):
+        self.write_records(units=range(2))
+        self.write_records(append=True, units=range(2, 4))
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 40)
+            self.assertEqual(len(list(reader.iter_rows("unit3"))), 10)
+        self.assertRaises(ValueError, ResultsWriter, self.fn, 6, append=True)
+    
+    def test_pool(self):
+        with ResultsWriter(self.fn, periods=12, chunk_size=16) as writer:
+            with Pool(2) as pool:
+                writer.write_many(pool.imap_unordered(make_record, [(u, m) for u in range(3) for m in range(10)]))
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 30)
+            for unit, scenario, member, values in reader.iter_rows("unit1"):
+                self.assertEqual(values, make_values(1, member))
+    
+    def test_incomplete_file(self):
+        writer = ResultsWriter(self.fn, periods=12)
+        writer.write("unit0", "scen0", 0, make_values(0, 0))
+        writer.flush()
+        self.assertRaises(ValueError, ResultsReader, self.fn)
+        writer.close()
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 1)
+        self.assertRaises(ValueError, writer.write, "unit0", "scen0", 1, make_values(0, 1))
+    
+    def test_rejected_record(self):
+        with ResultsWriter(self.fn, periods=12) as writer:
+            writer.write("unit0", "scen0", 0, make_values(0, 0))
+            bad_values = list(make_values(0, 1))
+            bad_values[5] = None
+            self.assertRaises(TypeError, writer.write, "unit0", "scen0", 1, bad_values)
+            for member in ["x", "3", 1.7, None]:
+                self.assertRaises(TypeError, writer.write, "unit0", "scen0", member, make_values(0, 1))
+            self.assertRaises(ValueError, writer.write, "unit0", "scen0", 1, make_values(0, 1, periods=11))
+            writer.write("unit0", "scen0", 2, make_values(0, 2))
+            self.assertEqual(writer.rows, 2)
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 2)
+            rows = list(reader.iter_rows())
+        self.assertEqual([r[2] for r in rows], [0, 2])
+        self.assertEqual(rows[1][3], make_values(0, 2))
+    
+    def test_interrupted_append(self):
+        self.write_records(units=range(2))
+        
+        # Let another process append some chunks and then die without closing the file
+        code = "import os, sys; from array import array; from schedirr.fileoutput import ResultsWriter\n"
+        code += "writer = ResultsWriter(sys.argv[1], periods=12, chunk_size=7, append=True)\n"
+        code += "for m in range(20): writer.write('unit9', 'scen0', m, array('f', 12 * [1.0]))\n"
+        code += "writer.flush(); writer._ResultsWriter__file.flush(); os._exit(1)"
+        package_dir = Path(__file__).resolve().parent.parent
+        proc = subprocess.run([sys.executable, "-c", code, str(self.fn)], cwd=package_dir.parent)
+        self.assertEqual(proc.returncode, 1)
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 20)
+            self.assertEqual(len(list(reader.iter_rows("unit1"))), 10)
+            self.assertEqual(list(reader.iter_rows("unit9")), [])
+        
+        # The file can still be extended afterwards
+        self.write_records(append=True, units=range(2, 3))
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 30)
+            rows = list(reader.iter_rows("unit2", "scen1"))
+        self.assertEqual([r[2] for r in rows], [1, 3, 5, 7, 9])
+        
+    def test_failed_append(self):
+        self.write_records(units=range(2))
+        with self.assertRaises(RuntimeError):
+            with ResultsWriter(self.fn, periods=12, chunk_size=7, append=True) as writer:
+                for member in range(10):
+                    writer.write("unit5", "scen0", member, make_values(5, member))
+                raise RuntimeError("Sweep failed")
+        with ResultsReader(self.fn) as reader:
+            self.assertEqual(len(reader), 20)
+            self.assertEqual(list(reader.iter_rows("unit5")), [])
+        
+def suite():
+    """ This defines all the tests of a module"""
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestResultsFile))
+    return suite